@@ -2,6 +2,7 @@ import sys
 sys.path.append("/opt/airflow")
 
 import logging
+import os
 from datetime import datetime
 
 from airflow.operators.python import PythonOperator
@@ -11,8 +12,10 @@ from plugins.slack_alert import slack_failure_alert
 from airflow import DAG
 # Import hàm ETL
 from etl.extract.extract_weather import extract_all_cities
+from etl.load.load_arrow import load_to_dwh_arrow
 from etl.load.load_to_dwh import load_to_dwh
-from etl.tranform.tranform_weather import tranform_city
+from etl.settings import get_settings
+from etl.transform.transform_weather import tranform_city
 
 # ============================
 #  Task Python functions
@@ -33,11 +36,13 @@ def tranform_task(**context):
         logging.warning("Không có file raw → bỏ qua transform")
         return None
 
+    raw_base = get_settings().raw_path
     out_files = []
     for file in file_list:
-        parts = file.split("/")
-        city = parts[2]
-        date = parts[3]
+        # <raw_path>/<city>/<yyyy-mm-dd>/<hour>/weather_*.json
+        parts = os.path.relpath(file, raw_base).replace("\\", "/").split("/")
+        city = parts[0]
+        date = parts[1]
 
         out_path = tranform_city(city, date)
         out_files.append(out_path)
@@ -47,16 +52,22 @@ def tranform_task(**context):
 
 
 def load_task(**context):
-    logging.info(">>> Running load_to_dwh()")
     parquet_files = context["ti"].xcom_pull(task_ids="tranform_task")
 
     if not parquet_files:
         logging.warning("Không có file clean → không load được.")
         return None
 
+    # load_engine trong config.json: "arrow" (mặc định) hoặc "rows"
+    if get_settings().load_engine == "arrow":
+        load_fn = load_to_dwh_arrow
+    else:
+        load_fn = load_to_dwh
+    logging.info(f">>> Running {load_fn.__name__}()")
+
     for parquet in parquet_files:
         logging.info(f"Loading parquet: {parquet}")
-        load_to_dwh(parquet)
+        load_fn(parquet)
 
     logging.info("Load xong!")
 
@@ -0,0 +1,243 @@
+"""
+So sanh load_to_dwh (pandas iterrows) va load_to_dwh_arrow (Arrow + COPY).
+
+    # 1) Tao file parquet clean gia lap (mac dinh 2 trieu dong)
+    python benchmarks/bench_load.py generate data/bench/clean.parquet --rows 2000000
+
+    # 2) So sanh phia client (khong can PostgreSQL): doc parquet, map key
+    #    dimension, chuan bi tham so / buffer COPY
+    python benchmarks/bench_load.py compare data/bench/clean.parquet
+
+    # 3) So sanh end-to-end voi DWH that (dung config/config.json + .env)
+    python benchmarks/bench_load.py compare data/bench/clean.parquet --db
+
+Moi path chay trong 1 subprocess rieng de do peak RSS (ru_maxrss) doc lap.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Tham so fact_weather theo dung thu tu insert_fact_weather
+FACT_PARAM_COLS = [
+    "timestamp_utc",
+    "temperature",
+    "feels_like",
+    "temp_min",
+    "temp_max",
+    "humidity",
+    "pressure",
+    "wind_speed",
+    "feels_like_diff",
+    "temp_category",
+    "is_rain",
+    "wind_level",
+    "temp_avg_3h",
+    "temp_avg_24h",
+    "temp_delta",
+    "rain_streak",
+]
+
+
+def generate(out_path, rows, cities, row_group_size=100_000):
+    from etl.transform.transform_weather import CLEAN_SCHEMA
+
+    rng = np.random.default_rng(42)
+    per_city = rows // cities
+    weathers = np.array(["Rain", "Clear", "Clouds", "Mist", "Snow"])
+    descriptions = np.array(["light rain", "clear sky", "broken clouds", "mist", "snow"])
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with pq.ParquetWriter(out_path, CLEAN_SCHEMA) as writer:
+        for start in range(0, per_city * cities, row_group_size):
+            n = min(row_group_size, per_city * cities - start)
+            idx = np.arange(start, start + n)
+            ts = 1704067200 + (idx % per_city) * 3600
+            timestamp_utc = ts.astype("datetime64[s]")
+            temperature = rng.normal(25, 8, n).round(2)
+            feels_like = (temperature + rng.normal(0, 2, n)).round(2)
+            weather_idx = rng.integers(0, len(weathers), n)
+            columns = {
+                "city": np.char.add("City_", (idx // per_city).astype(str)),
+                "temperature": temperature,
+                "feels_like": feels_like,
+                "temp_min": temperature - 2,
+                "temp_max": temperature + 2,
+                "humidity": rng.integers(20, 100, n),
+                "pressure": rng.integers(990, 1030, n),
+                "weather": weathers[weather_idx],
+                "weather_description": descriptions[weather_idx],
+                "wind_speed": rng.uniform(0, 15, n),
+                "timestamp": ts,
+                "timestamp_utc": timestamp_utc,
+                "date": np.datetime_as_string(timestamp_utc, unit="D"),
+                "hour": (ts // 3600) % 24,
+                "feels_like_diff": feels_like - temperature,
+                "temp_category": np.where(
+                    temperature > 30, "hot", np.where(temperature >= 20, "warm", "cold")
+                ),
+                "is_rain": weather_idx == 0,
+                "wind_level": np.where(rng.uniform(0, 15, n) > 10, "high", "normal"),
+                "weather_category": weathers[weather_idx],
+                "temp_avg_3h": temperature,
+                "temp_avg_24h": temperature,
+                "temp_delta": rng.normal(0, 1, n),
+                "rain_streak": rng.integers(0, 5, n),
+            }
+            arrays = [pa.array(columns[f.name], type=f.type) for f in CLEAN_SCHEMA]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=CLEAN_SCHEMA))
+
+    print(f"Generated {per_city * cities} rows -> {out_path}")
+
+
+def run_rows_client(parquet_file):
+    """
+    Phan client cua load_to_dwh: read_parquet -> iterrows -> tuple tham so.
+    Key dimension lay tu dict (khong tinh round-trip DB).
+    """
+    from etl.load.load_to_dwh import load_parquet_to_df
+
+    df = load_parquet_to_df(parquet_file)
+    cities, conditions, dates = {}, {}, {}
+    count = 0
+    for _, row in df.iterrows():
+        city_id = cities.setdefault(row["city"], len(cities) + 1)
+        cond_id = conditions.setdefault(
+            (row["weather"], row["weather_description"], row["weather"]),
+            len(conditions) + 1,
+        )
+        date_id = dates.setdefault(
+            int(row["date"].replace("-", "") + f"{row['hour']:02}"), len(dates) + 1
+        )
+        params = (city_id, cond_id, date_id) + tuple(
+            row.get(col) for col in FACT_PARAM_COLS
+        )
+        count += 1
+    return count
+
+
+def run_arrow_client(parquet_file, batch_size):
+    """
+    Phan client cua load_to_dwh_arrow: iter_batches -> map key -> buffer COPY.
+    Key dimension lay tu dict (khong tinh round-trip DB).
+    """
+    from etl.load.load_arrow import (
+        DimensionKeyCache,
+        build_stage_batch,
+        map_dimension_keys,
+        select_parquet_columns,
+        write_copy_buffer,
+    )
+
+    class OfflineDimensionKeyCache(DimensionKeyCache):
+        def city_id(self, city_name):
+            return self.cities.setdefault(city_name, len(self.cities) + 1)
+
+        def condition_id(self, weather, description, category):
+            key = (weather, description, category)
+            return self.conditions.setdefault(key, len(self.conditions) + 1)
+
+        def date_id(self, date_id, date_str, hour):
+            return self.dates.setdefault(date_id, len(self.dates) + 1)
+
+    dims = OfflineDimensionKeyCache(None, None)
+    count = 0
+    parquet = pq.ParquetFile(parquet_file)
+    columns = select_parquet_columns(parquet.schema_arrow)
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+        city_id, condition_id, date_id = map_dimension_keys(batch, dims)
+        stage_batch = build_stage_batch(batch, city_id, condition_id, date_id)
+        write_copy_buffer(stage_batch)
+        count += batch.num_rows
+    return count
+
+
+def run(mode, parquet_file, db, batch_size):
+    start = time.perf_counter()
+    if db:
+        if mode == "rows":
+            from etl.load.load_to_dwh import load_to_dwh
+
+            load_to_dwh(parquet_file)
+        else:
+            from etl.load.load_arrow import load_to_dwh_arrow
+
+            load_to_dwh_arrow(parquet_file, batch_size=batch_size)
+        rows = pq.ParquetFile(parquet_file).metadata.num_rows
+    elif mode == "rows":
+        rows = run_rows_client(parquet_file)
+    else:
+        rows = run_arrow_client(parquet_file, batch_size)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss: KB tren Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "rows": rows,
+                "seconds": round(elapsed, 2),
+                "rows_per_sec": round(rows / elapsed),
+                "peak_rss_mb": round(peak_mb, 1),
+            }
+        )
+    )
+
+
+def compare(parquet_file, db, batch_size):
+    results = []
+    for mode in ("rows", "arrow"):
+        cmd = [sys.executable, os.path.abspath(__file__), "run", mode, parquet_file]
+        cmd += ["--batch-size", str(batch_size)]
+        if db:
+            cmd.append("--db")
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{'mode':<8}{'rows':>12}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>14}")
+    for r in results:
+        print(
+            f"{r['mode']:<8}{r['rows']:>12}{r['seconds']:>10}"
+            f"{r['rows_per_sec']:>12}{r['peak_rss_mb']:>14}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate")
+    gen.add_argument("out")
+    gen.add_argument("--rows", type=int, default=2_000_000)
+    gen.add_argument("--cities", type=int, default=200)
+
+    for name in ("run", "compare"):
+        p = sub.add_parser(name)
+        if name == "run":
+            p.add_argument("mode", choices=["rows", "arrow"])
+        p.add_argument("parquet")
+        p.add_argument("--db", action="store_true")
+        p.add_argument("--batch-size", type=int, default=50_000)
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.out, args.rows, args.cities)
+    elif args.command == "run":
+        run(args.mode, args.parquet, args.db, args.batch_size)
+    else:
+        compare(args.parquet, args.db, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,25 +6,24 @@ from datetime import datetime
 
 import requests
 
+from etl.settings import SettingsError, get_api_key, get_settings
+
 logging.basicConfig(level=logging.INFO)
 
 
 # Tao url api cho tung thanh pho
 def build_api_url(city):
-    try:
-        with open("config/config.json", "r") as f:
-            cfg = json.load(f)
-        api_url = (
-            "https://api.openweathermap.org/data/2.5/weather?q="
-            + city
-            + "&appid="
-            + cfg["api_key"]
-            + "&units=metric"
-        )
-        return api_url
-    except Exception as e:
-        print(f"Error: {e}")
-        return ""
+    api_key = get_api_key()
+    if not api_key:
+        raise SettingsError("Missing api_key in config.json (or OPENWEATHER_API_KEY)")
+    api_url = (
+        "https://api.openweathermap.org/data/2.5/weather?q="
+        + city
+        + "&appid="
+        + api_key
+        + "&units=metric"
+    )
+    return api_url
 
 
 # Goi api va nhan json
@@ -49,9 +48,7 @@ def build_raw_path(city):
     day = now.strftime("%Y-%m-%d")
     hour = now.strftime("%H")
     # Tao cau truc folder
-    with open("config/config.json", "r") as f:
-        cfg = json.load(f)
-        raw_base = cfg["raw_path"]
+    raw_base = get_settings().raw_path
     full_path = os.path.join(raw_base, city, day, hour)
     os.makedirs(full_path, exist_ok=True)
     return full_path
@@ -78,14 +75,8 @@ def extract_all_cities():
     logging.info("===== 🚀 START EXTRACT =====")
     start = time.time()
 
-    # Doc file config.json
-    try:
-        with open("config/config.json", "r") as f:
-            config = json.load(f)
-            cities = config.get("cities", [])
-    except Exception as e:
-        logging.error(f"Cannot read config.json: {e}")
-        return []
+    # Doc settings (config.json + .env), loi config se lam fail task
+    cities = get_settings().cities
 
     save_files = []
     # Loop tung city
@@ -0,0 +1,410 @@
+import io
+import logging
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from etl.load.load_to_dwh import (
+    connect_postgres,
+    get_or_create_city,
+    get_or_create_condition,
+    get_or_create_date,
+    invalidate_latest_weather_cache,
+)
+from etl.transform.rolling_features import promote_pending_state
+
+logging.basicConfig(level=logging.INFO)
+
+# So dong moi record batch doc tu parquet / moi lan COPY
+LOAD_BATCH_SIZE = 50_000
+
+# Cot trong bang staging, dung thu tu voi stage batch ghi ra COPY
+STAGE_COLUMNS = [
+    ("city_id", "INT", pa.int32()),
+    ("condition_id", "INT", pa.int32()),
+    ("date_id", "BIGINT", pa.int64()),
+    ("timestamp_utc", "TIMESTAMP", pa.timestamp("us")),
+    ("temperature", "DOUBLE PRECISION", pa.float64()),
+    ("feels_like", "DOUBLE PRECISION", pa.float64()),
+    ("temp_min", "DOUBLE PRECISION", pa.float64()),
+    ("temp_max", "DOUBLE PRECISION", pa.float64()),
+    ("humidity", "INT", pa.int64()),
+    ("pressure", "INT", pa.int64()),
+    ("wind_speed", "DOUBLE PRECISION", pa.float64()),
+    ("feels_like_diff", "DOUBLE PRECISION", pa.float64()),
+    ("temp_category", "VARCHAR(255)", pa.string()),
+    ("is_rain", "BOOLEAN", pa.bool_()),
+    ("wind_level", "VARCHAR(255)", pa.string()),
+    ("temp_avg_3h", "DOUBLE PRECISION", pa.float64()),
+    ("temp_avg_24h", "DOUBLE PRECISION", pa.float64()),
+    ("temp_delta", "DOUBLE PRECISION", pa.float64()),
+    ("rain_streak", "INT", pa.int64()),
+    ("city_name", "VARCHAR(255)", pa.string()),
+    ("weather", "VARCHAR(255)", pa.string()),
+    ("weather_description", "VARCHAR(255)", pa.string()),
+    ("weather_category", "VARCHAR(255)", pa.string()),
+]
+
+# Cot can doc tu parquet clean
+PARQUET_COLUMNS = [
+    "city",
+    "date",
+    "hour",
+    "timestamp_utc",
+    "temperature",
+    "feels_like",
+    "temp_min",
+    "temp_max",
+    "humidity",
+    "pressure",
+    "weather",
+    "weather_description",
+    "weather_category",
+    "wind_speed",
+    "feels_like_diff",
+    "temp_category",
+    "is_rain",
+    "wind_level",
+    "temp_avg_3h",
+    "temp_avg_24h",
+    "temp_delta",
+    "rain_streak",
+]
+
+
+def select_parquet_columns(schema):
+    """
+    Cot cua PARQUET_COLUMNS co trong file. Parquet ghi truoc khi co
+    weather_category / cot rolling van load duoc, cot thieu = NULL.
+    """
+    names = set(schema.names)
+    missing = [name for name in PARQUET_COLUMNS if name not in names]
+    if missing:
+        logging.warning(f"⚠️ Parquet thiếu cột {missing}, load với giá trị NULL")
+    return [name for name in PARQUET_COLUMNS if name in names]
+
+
+class DimensionKeyCache:
+    """
+    Cache key dimension trong 1 lan load: moi gia tri unique chi get_or_create 1 lan.
+    """
+
+    def __init__(self, cursor, conn):
+        self.cursor = cursor
+        self.conn = conn
+        self.cities = {}
+        self.conditions = {}
+        self.dates = {}
+
+    def city_id(self, city_name):
+        if city_name not in self.cities:
+            self.cities[city_name] = get_or_create_city(
+                self.cursor, self.conn, city_name
+            )
+        return self.cities[city_name]
+
+    def condition_id(self, weather, description, category):
+        key = (weather, description, category)
+        if key not in self.conditions:
+            self.conditions[key] = get_or_create_condition(
+                self.cursor, self.conn, weather, description, category
+            )
+        return self.conditions[key]
+
+    def date_id(self, date_id, date_str, hour):
+        if date_id not in self.dates:
+            self.dates[date_id] = get_or_create_date(
+                self.cursor, self.conn, date_str, hour
+            )
+        return self.dates[date_id]
+
+
+def _factorize(columns):
+    """
+    Ma hoa to hop gia tri cua nhieu cot (ke ca NULL) bang dictionary + NumPy.
+    Tra ve (vi tri dong dai dien cho moi to hop unique, inverse index moi dong).
+    """
+    code = np.zeros(len(columns[0]), dtype=np.int64)
+    for col in columns:
+        encoded = pc.dictionary_encode(col)
+        size = len(encoded.dictionary) + 1
+        indices = pc.fill_null(encoded.indices, size - 1)
+        code = code * size + indices.to_numpy(zero_copy_only=False)
+    _, first_rows, inverse = np.unique(code, return_index=True, return_inverse=True)
+    return first_rows, inverse.reshape(-1)
+
+
+def _resolve_ids(first_rows, resolve):
+    # Goi get_or_create theo thu tu xuat hien -> id dimension giong ban iterrows
+    ids = [None] * len(first_rows)
+    for u in np.argsort(first_rows, kind="stable"):
+        ids[u] = resolve(int(first_rows[u]))
+    return ids
+
+
+def _ids_to_array(ids, inverse, type_):
+    # None (get_or_create loi) -> NULL, giong ban iterrows
+    values = pa.array(ids, type=type_)
+    return values.take(pa.array(inverse))
+
+
+def map_dimension_keys(batch, dims):
+    """
+    Map city_id / condition_id / date_id cho ca batch.
+    Chi goi DB cho gia tri unique, con lai la thao tac vector Arrow/NumPy.
+    """
+    city = batch.column("city")
+    first_rows, inverse = _factorize([city])
+    city_ids = _resolve_ids(first_rows, lambda i: dims.city_id(city[i].as_py()))
+    city_id = _ids_to_array(city_ids, inverse, pa.int32())
+
+    weather = batch.column("weather")
+    description = batch.column("weather_description")
+    first_rows, inverse = _factorize([weather, description])
+    cond_ids = _resolve_ids(
+        first_rows,
+        lambda i: dims.condition_id(
+            weather[i].as_py(),
+            description[i].as_py(),
+            weather[i].as_py(),  # giong load_to_dwh: category = weather
+        ),
+    )
+    condition_id = _ids_to_array(cond_ids, inverse, pa.int32())
+
+    # date_id = YYYYMMDDHH
+    date = batch.column("date")
+    hour = batch.column("hour")
+    day_key = pc.cast(pc.replace_substring(date, "-", ""), pa.int64())
+    date_key = pc.add(pc.multiply(day_key, 100), pc.cast(hour, pa.int64()))
+    first_rows, inverse = _factorize([date_key])
+    date_ids = _resolve_ids(
+        first_rows,
+        lambda i: dims.date_id(
+            date_key[i].as_py(), date[i].as_py(), hour[i].as_py()
+        ),
+    )
+    date_id = _ids_to_array(date_ids, inverse, pa.int64())
+
+    return city_id, condition_id, date_id
+
+
+def build_stage_batch(batch, city_id, condition_id, date_id):
+    """
+    Ghep key dimension + cot metric thanh RecordBatch theo STAGE_COLUMNS.
+    Cot khong co trong batch (parquet cu) duoc dien NULL.
+    """
+    derived = {
+        "city_id": city_id,
+        "condition_id": condition_id,
+        "date_id": date_id,
+        "city_name": batch.column("city"),
+    }
+    names = set(batch.schema.names)
+    arrays = []
+    for name, _, type_ in STAGE_COLUMNS:
+        if name in derived:
+            column = derived[name]
+        elif name in names:
+            column = batch.column(name)
+        else:
+            column = pa.nulls(batch.num_rows, type_)
+        arrays.append(pc.cast(column, type_))
+    return pa.RecordBatch.from_arrays(arrays, names=[c[0] for c in STAGE_COLUMNS])
+
+
+def write_copy_buffer(stage_batch):
+    """
+    Serialize RecordBatch sang COPY ... (FORMAT csv) bang Arrow CSV writer (C++),
+    khong tao Python object cho tung dong.
+    """
+    buffer = io.BytesIO()
+    pa_csv.write_csv(
+        stage_batch, buffer, pa_csv.WriteOptions(include_header=False)
+    )
+    buffer.seek(0)
+    return buffer
+
+
+def create_stage_table(cursor):
+    columns = ",\n".join(f"    {name} {sql_type}" for name, sql_type, _ in STAGE_COLUMNS)
+    # pg_temp: khong bao gio drop nham bang that cung ten trong search_path
+    cursor.execute("DROP TABLE IF EXISTS pg_temp.stage_fact_weather;")
+    cursor.execute(f"CREATE TEMP TABLE stage_fact_weather (\n{columns}\n);")
+
+
+def copy_stage_batch(cursor, stage_batch):
+    column_list = ", ".join(name for name, _, _ in STAGE_COLUMNS)
+    cursor.copy_expert(
+        f"COPY stage_fact_weather ({column_list}) FROM STDIN WITH (FORMAT csv)",
+        write_copy_buffer(stage_batch),
+    )
+
+
+def merge_stage_to_fact(cursor):
+    """
+    Upsert staging -> fact_weather (1 dong / (city_id, timestamp_utc)).
+    """
+    cursor.execute(
+        """
+        INSERT INTO fact_weather (
+            city_id, condition_id, date_id, timestamp_utc,
+            temperature, feels_like, temp_min, temp_max,
+            humidity, pressure, wind_speed,
+            feels_like_diff, temp_category, is_rain, wind_level,
+            temp_avg_3h, temp_avg_24h, temp_delta, rain_streak
+        )
+        SELECT DISTINCT ON (city_id, timestamp_utc)
+            city_id, condition_id, date_id, timestamp_utc,
+            temperature, feels_like, temp_min, temp_max,
+            humidity, pressure, wind_speed,
+            feels_like_diff, temp_category, is_rain, wind_level,
+            temp_avg_3h, temp_avg_24h, temp_delta, rain_streak
+        FROM stage_fact_weather
+        ORDER BY city_id, timestamp_utc, (temp_avg_3h IS NULL)
+        ON CONFLICT (city_id, timestamp_utc)
+        DO UPDATE SET
+            condition_id     = EXCLUDED.condition_id,
+            temperature      = EXCLUDED.temperature,
+            feels_like       = EXCLUDED.feels_like,
+            temp_min         = EXCLUDED.temp_min,
+            temp_max         = EXCLUDED.temp_max,
+            humidity         = EXCLUDED.humidity,
+            pressure         = EXCLUDED.pressure,
+            wind_speed       = EXCLUDED.wind_speed,
+            feels_like_diff  = EXCLUDED.feels_like_diff,
+            temp_category    = EXCLUDED.temp_category,
+            is_rain          = EXCLUDED.is_rain,
+            wind_level       = EXCLUDED.wind_level,
+            -- rolling NULL = da tinh o lan chay truoc -> giu gia tri cu
+            temp_avg_3h      = COALESCE(EXCLUDED.temp_avg_3h, fact_weather.temp_avg_3h),
+            temp_avg_24h     = COALESCE(EXCLUDED.temp_avg_24h, fact_weather.temp_avg_24h),
+            temp_delta       = COALESCE(EXCLUDED.temp_delta, fact_weather.temp_delta),
+            rain_streak      = COALESCE(EXCLUDED.rain_streak, fact_weather.rain_streak);
+    """
+    )
+    return cursor.rowcount
+
+
+def merge_stage_to_latest(cursor):
+    """
+    Upsert ban ghi moi nhat / city tu staging -> latest_weather.
+    """
+    cursor.execute(
+        """
+        INSERT INTO latest_weather (
+            city_id, city_name, condition_id, date_id, timestamp_utc,
+            temperature, feels_like, temp_min, temp_max,
+            humidity, pressure, wind_speed, feels_like_diff,
+            weather, weather_description, weather_category,
+            temp_category, is_rain, wind_level, updated_at
+        )
+        SELECT DISTINCT ON (city_id)
+            city_id, city_name, condition_id, date_id, timestamp_utc,
+            temperature, feels_like, temp_min, temp_max,
+            humidity, pressure, wind_speed, feels_like_diff,
+            weather, weather_description, weather_category,
+            temp_category, is_rain, wind_level, NOW()
+        FROM stage_fact_weather
+        WHERE city_id IS NOT NULL
+        ORDER BY city_id, timestamp_utc DESC
+        ON CONFLICT (city_id)
+        DO UPDATE SET
+            city_name           = EXCLUDED.city_name,
+            condition_id        = EXCLUDED.condition_id,
+            date_id             = EXCLUDED.date_id,
+            timestamp_utc       = EXCLUDED.timestamp_utc,
+            temperature         = EXCLUDED.temperature,
+            feels_like          = EXCLUDED.feels_like,
+            temp_min            = EXCLUDED.temp_min,
+            temp_max            = EXCLUDED.temp_max,
+            humidity            = EXCLUDED.humidity,
+            pressure            = EXCLUDED.pressure,
+            wind_speed          = EXCLUDED.wind_speed,
+            feels_like_diff     = EXCLUDED.feels_like_diff,
+            weather             = EXCLUDED.weather,
+            weather_description = EXCLUDED.weather_description,
+            weather_category    = EXCLUDED.weather_category,
+            temp_category       = EXCLUDED.temp_category,
+            is_rain             = EXCLUDED.is_rain,
+            wind_level          = EXCLUDED.wind_level,
+            updated_at          = NOW()
+        WHERE latest_weather.timestamp_utc < EXCLUDED.timestamp_utc;
+    """
+    )
+
+
+def load_to_dwh_arrow(parquet_file, batch_size=LOAD_BATCH_SIZE):
+    """
+    Load parquet clean -> PostgreSQL bang Arrow record batch + COPY.
+    Ket qua trong DWH giong load_to_dwh, nhung khong tao pandas Series / tuple
+    Python cho tung dong: parquet -> RecordBatch -> CSV (COPY) -> staging -> upsert.
+    """
+
+    logging.info(f"===== 📥 START ARROW LOAD for {parquet_file} =====")
+    start = time.time()
+
+    # 1) Mo parquet (doc theo record batch, khong load ca file)
+    try:
+        parquet = pq.ParquetFile(parquet_file)
+    except FileNotFoundError:
+        logging.error(f"Không tìm thấy file Parquet: {parquet_file}")
+        return
+    except Exception as e:
+        logging.error(f"Lỗi load Parquet: {e}")
+        return
+
+    if parquet.metadata.num_rows == 0:
+        logging.error("❌ Cannot load to DWH with an empty parquet file.")
+        return
+
+    # 2) Kết nối PostgreSQL
+    conn, cursor = connect_postgres()
+    if not conn:
+        logging.error("❌ Unable to connect to PostgreSQL")
+        return
+
+    logging.info(f"📌 Records to load: {parquet.metadata.num_rows}")
+    dims = DimensionKeyCache(cursor, conn)
+    columns = select_parquet_columns(parquet.schema_arrow)
+
+    try:
+        # 3) Staging (TEMP table, song het session)
+        create_stage_table(cursor)
+        conn.commit()
+
+        total = 0
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+            city_id, condition_id, date_id = map_dimension_keys(batch, dims)
+            stage_batch = build_stage_batch(batch, city_id, condition_id, date_id)
+            copy_stage_batch(cursor, stage_batch)
+            # get_or_create_* co the rollback -> commit de khong mat batch da COPY
+            conn.commit()
+            total += batch.num_rows
+            logging.info(f"Đã COPY {total} bản ghi vào staging")
+
+        # 4) Staging -> fact_weather + latest_weather trong 1 transaction
+        upserted = merge_stage_to_fact(cursor)
+        merge_stage_to_latest(cursor)
+        cursor.execute("DROP TABLE IF EXISTS pg_temp.stage_fact_weather;")
+        conn.commit()
+        invalidate_latest_weather_cache()
+        logging.info(f"Đã upsert {upserted} bản ghi vào fact_weather")
+
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Lỗi ARROW LOAD (rollback): {e}")
+        conn.close()
+        raise
+
+    # 5) Đóng connection
+    conn.close()
+
+    # 6) fact_weather đã commit -> promote rolling state của transform
+    promote_pending_state(parquet_file)
+    logging.info("💾 Load completed successfully")
+    logging.info(f"⏱ Load time: {time.time() - start:.2f}s")
+    logging.info(f"===== ✅ END ARROW LOAD for {parquet_file} =====")
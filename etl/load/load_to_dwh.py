@@ -1,28 +1,23 @@
 import logging
-import os
+import threading
 import time
 
 import pandas as pd
 import psycopg2
-from dotenv import load_dotenv
+
+from etl.settings import get_postgres_settings
+from etl.transform.rolling_features import promote_pending_state
 
 logging.basicConfig(level=logging.INFO)
 
 
 def connect_postgres():
     try:
-        # 1) Load biến môi trường từ .env
-        load_dotenv()
-        host = os.getenv("POSTGRES_HOST")
-        port = os.getenv("POSTGRES_PORT")
-        user = os.getenv("POSTGRES_USER")
-        password = os.getenv("POSTGRES_PASSWORD")
-        dbname = os.getenv("POSTGRES_DB")
+        # 1) Lấy thông tin kết nối từ .env (đã được cache)
+        params = get_postgres_settings().params()
 
         # 2) Kết nối Postgres
-        conn = psycopg2.connect(
-            host=host, port=port, user=user, password=password, database=dbname
-        )
+        conn = psycopg2.connect(**params)
 
         cursor = conn.cursor()
         logging.info("Kết nối PostgreSQL thành công.")
@@ -183,6 +178,13 @@ BATCH_SIZE = 50
 batch_counter = 0
 
 
+def _nullable(value):
+    # NaN (cột rolling của bản ghi đã xử lý) -> NULL
+    if value is None or pd.isna(value):
+        return None
+    return value
+
+
 def insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id):
     """
     Insert hoặc Update 1 bản ghi vào fact_weather (UPSERT).
@@ -197,9 +199,11 @@ def insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id):
                 city_id, condition_id, date_id,timestamp_utc,
                 temperature, feels_like, temp_min, temp_max,
                 humidity, pressure, wind_speed,
-                feels_like_diff, temp_category, is_rain, wind_level
+                feels_like_diff, temp_category, is_rain, wind_level,
+                temp_avg_3h, temp_avg_24h, temp_delta, rain_streak
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    %s, %s, %s, %s)
             ON CONFLICT (city_id, timestamp_utc)
             DO UPDATE SET
                 condition_id     = EXCLUDED.condition_id,
@@ -213,7 +217,12 @@ def insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id):
                 feels_like_diff  = EXCLUDED.feels_like_diff,
                 temp_category    = EXCLUDED.temp_category,
                 is_rain          = EXCLUDED.is_rain,
-                wind_level       = EXCLUDED.wind_level;
+                wind_level       = EXCLUDED.wind_level,
+                -- rolling NULL = đã tính ở lần chạy trước -> giữ giá trị cũ
+                temp_avg_3h      = COALESCE(EXCLUDED.temp_avg_3h, fact_weather.temp_avg_3h),
+                temp_avg_24h     = COALESCE(EXCLUDED.temp_avg_24h, fact_weather.temp_avg_24h),
+                temp_delta       = COALESCE(EXCLUDED.temp_delta, fact_weather.temp_delta),
+                rain_streak      = COALESCE(EXCLUDED.rain_streak, fact_weather.rain_streak);
         """,
             (
                 city_id,
@@ -231,6 +240,10 @@ def insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id):
                 row.get("temp_category"),
                 row.get("is_rain"),
                 row.get("wind_level"),
+                _nullable(row.get("temp_avg_3h")),
+                _nullable(row.get("temp_avg_24h")),
+                _nullable(row.get("temp_delta")),
+                _nullable(row.get("rain_streak")),
             ),
         )
 
@@ -241,18 +254,147 @@ def insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id):
         if batch_counter % BATCH_SIZE == 0:
             conn.commit()
             logging.info(f"Đã commit batch {batch_counter}")
+        return True
 
     except Exception as e:
         conn.rollback()
         logging.error(f"Lỗi UPSERT fact_weather (rollback batch): {e}")
+        return False
+
+
+def upsert_latest_weather(cursor, conn, city_name, row, city_id, cond_id, date_id):
+    """
+    Cập nhật snapshot latest_weather (1 dòng / city).
+    Chỉ ghi đè khi timestamp_utc mới hơn bản ghi đang lưu.
+    """
+    try:
+        cursor.execute(
+            """
+            INSERT INTO latest_weather (
+                city_id, city_name, condition_id, date_id, timestamp_utc,
+                temperature, feels_like, temp_min, temp_max,
+                humidity, pressure, wind_speed, feels_like_diff,
+                weather, weather_description, weather_category,
+                temp_category, is_rain, wind_level, updated_at
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    %s, %s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (city_id)
+            DO UPDATE SET
+                city_name           = EXCLUDED.city_name,
+                condition_id        = EXCLUDED.condition_id,
+                date_id             = EXCLUDED.date_id,
+                timestamp_utc       = EXCLUDED.timestamp_utc,
+                temperature         = EXCLUDED.temperature,
+                feels_like          = EXCLUDED.feels_like,
+                temp_min            = EXCLUDED.temp_min,
+                temp_max            = EXCLUDED.temp_max,
+                humidity            = EXCLUDED.humidity,
+                pressure            = EXCLUDED.pressure,
+                wind_speed          = EXCLUDED.wind_speed,
+                feels_like_diff     = EXCLUDED.feels_like_diff,
+                weather             = EXCLUDED.weather,
+                weather_description = EXCLUDED.weather_description,
+                weather_category    = EXCLUDED.weather_category,
+                temp_category       = EXCLUDED.temp_category,
+                is_rain             = EXCLUDED.is_rain,
+                wind_level          = EXCLUDED.wind_level,
+                updated_at          = NOW()
+            WHERE latest_weather.timestamp_utc < EXCLUDED.timestamp_utc;
+        """,
+            (
+                city_id,
+                city_name,
+                cond_id,
+                date_id,
+                row.get("timestamp_utc"),
+                row.get("temperature"),
+                row.get("feels_like"),
+                row.get("temp_min"),
+                row.get("temp_max"),
+                row.get("humidity"),
+                row.get("pressure"),
+                row.get("wind_speed"),
+                row.get("feels_like_diff"),
+                row.get("weather"),
+                row.get("weather_description"),
+                row.get("weather_category"),
+                row.get("temp_category"),
+                row.get("is_rain"),
+                row.get("wind_level"),
+            ),
+        )
+        conn.commit()
+        invalidate_latest_weather_cache()
+
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Lỗi UPSERT latest_weather: {e}")
+
+
+LATEST_CACHE_TTL = 60
+_latest_lock = threading.Lock()
+_latest_cache = {"data": None, "loaded_at": 0.0}
+
+
+def invalidate_latest_weather_cache():
+    with _latest_lock:
+        _latest_cache["data"] = None
+        _latest_cache["loaded_at"] = 0.0
+
+
+def _refresh_latest_weather():
+    conn, cursor = connect_postgres()
+    if not conn:
+        logging.error("❌ Unable to connect to PostgreSQL")
+        return None
+
+    try:
+        cursor.execute("SELECT * FROM latest_weather;")
+        cols = [desc[0] for desc in cursor.description]
+        data = {}
+        for values in cursor.fetchall():
+            record = dict(zip(cols, values))
+            data[record["city_name"]] = record
+        return data
+    except Exception as e:
+        logging.error(f"Lỗi SELECT latest_weather: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_latest_weather(city_name=None, max_age=LATEST_CACHE_TTL):
+    """
+    Đọc thời tiết hiện tại từ latest_weather, cache trong process.
+    Trả về dict {city_name: {...}} hoặc 1 dict nếu truyền city_name.
+    Cache được làm mới sau max_age giây hoặc khi load stage upsert.
+    Luôn trả về bản copy để caller sửa không ảnh hưởng consumer khác.
+    """
+    with _latest_lock:
+        data = _latest_cache["data"]
+        now = time.time()
+        if data is None or now - _latest_cache["loaded_at"] > max_age:
+            data = _refresh_latest_weather()
+            if data is None:
+                return None if city_name is not None else {}
+            _latest_cache["data"] = data
+            _latest_cache["loaded_at"] = now
+
+    if city_name is not None:
+        record = data.get(city_name)
+        return dict(record) if record is not None else None
+    return {name: dict(record) for name, record in data.items()}
 
 
 def finalize_fact_batch(conn):
     try:
         conn.commit()
         logging.info("Commit batch cuối.")
+        return True
     except Exception as e:
         logging.error(f"Lỗi final commit: {e}")
+        return False
 
 
 def load_to_dwh(parquet_file):
@@ -263,6 +405,7 @@ def load_to_dwh(parquet_file):
         - dim_weather_condition
         - dim_date
         - fact_weather
+        - latest_weather (snapshot mới nhất / city)
     """
 
     logging.info(f"===== 📥 START LOAD for {parquet_file} =====")
@@ -283,6 +426,10 @@ def load_to_dwh(parquet_file):
 
     logging.info(f"📌 Records to load: {len(df)}")
 
+    # Bản ghi mới nhất của từng city trong file -> latest_weather
+    latest_rows = {}
+    fact_ok = True
+
     # 3) Loop từng dòng trong DataFrame
     for _, row in df.iterrows():
 
@@ -304,13 +451,27 @@ def load_to_dwh(parquet_file):
         )
 
         # ---- FACT TABLE ----
-        insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id)
+        fact_ok &= insert_fact_weather(cursor, conn, row, city_id, cond_id, date_id)
+
+        current = latest_rows.get(row["city"])
+        if current is None or row["timestamp_utc"] > current[0]["timestamp_utc"]:
+            latest_rows[row["city"]] = (row, city_id, cond_id, date_id)
 
     # 4) Commit batch còn lại
-    finalize_fact_batch(conn)
+    fact_ok &= finalize_fact_batch(conn)
+
+    # ---- SNAPSHOT TABLE ----
+    for city_name, (row, city_id, cond_id, date_id) in latest_rows.items():
+        upsert_latest_weather(cursor, conn, city_name, row, city_id, cond_id, date_id)
 
     # 5) Đóng connection
     conn.close()
+
+    # 6) fact_weather đã commit đủ -> promote rolling state của transform
+    if fact_ok:
+        promote_pending_state(parquet_file)
+    else:
+        logging.warning("[ROLLING] fact_weather có lỗi, không promote rolling state.")
     logging.info("💾 Load completed successfully")
     logging.info(f"⏱ Load time: {time.time() - start:.2f}s")
     logging.info(f"===== ✅ END LOAD for {parquet_file} =====")
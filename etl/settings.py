@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from dotenv import dotenv_values, find_dotenv
+
+logging.basicConfig(level=logging.INFO)
+
+CONFIG_PATH = os.getenv("WEATHER_CONFIG_PATH", "config/config.json")
+
+REQUIRED_CONFIG_KEYS = ["cities", "raw_path", "clean_path"]
+
+
+class SettingsError(ValueError):
+    """
+    Config / biến môi trường thiếu hoặc sai kiểu.
+    """
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    cities: List[str]
+    raw_path: str
+    clean_path: str
+    # api_key trong config.json; fallback OPENWEATHER_API_KEY đọc lúc gọi (get_api_key)
+    api_key: Optional[str] = field(default=None, repr=False)
+    # None -> transform in-memory; > 0 -> streaming theo batch record
+    transform_batch_size: Optional[int] = None
+    # State rolling feature (ring buffer / city) giua cac lan chay
+    state_path: str = "data/state"
+    # "arrow" (record batch + COPY) hoac "rows" (pandas iterrows)
+    load_engine: str = "arrow"
+
+
+@dataclass(frozen=True)
+class PostgresSettings:
+    host: Optional[str] = None
+    port: Optional[str] = None
+    user: Optional[str] = None
+    password: Optional[str] = field(default=None, repr=False)
+    dbname: Optional[str] = None
+
+    def params(self):
+        """
+        Tham số cho psycopg2.connect. Báo lỗi rõ ràng nếu thiếu biến .env.
+        """
+        values = {
+            "POSTGRES_HOST": self.host,
+            "POSTGRES_PORT": self.port,
+            "POSTGRES_USER": self.user,
+            "POSTGRES_PASSWORD": self.password,
+            "POSTGRES_DB": self.dbname,
+        }
+        missing = [key for key, value in values.items() if not value]
+        if missing:
+            raise SettingsError(f"Missing environment variables: {', '.join(missing)}")
+        return {
+            "host": self.host,
+            "port": self.port,
+            "user": self.user,
+            "password": self.password,
+            "database": self.dbname,
+        }
+
+
+# Cache trong process, reload khi config.json / .env thay đổi (path hoặc mtime);
+# biến môi trường của process không cache
+_lock = threading.Lock()
+_cache = {
+    "settings": None,
+    "settings_key": None,
+    "dotenv": None,
+    "dotenv_key": None,
+}
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def _find_env_path():
+    # Tìm lại mỗi lần: .env tạo mới / di chuyển sau khi import vẫn được nhận
+    return find_dotenv(usecwd=True) or find_dotenv()
+
+
+def _read_config(path):
+    try:
+        with open(path, "r") as f:
+            cfg = json.load(f)
+    except FileNotFoundError:
+        raise SettingsError(f"Config file not found: {path}")
+    except json.JSONDecodeError as e:
+        raise SettingsError(f"Invalid JSON in {path}: {e}")
+
+    if not isinstance(cfg, dict):
+        raise SettingsError(f"{path} must contain a JSON object")
+    return cfg
+
+
+def _build_settings(cfg):
+    missing = [key for key in REQUIRED_CONFIG_KEYS if key not in cfg]
+    if missing:
+        raise SettingsError(f"Missing keys in {CONFIG_PATH}: {', '.join(missing)}")
+
+    cities = cfg["cities"]
+    if not isinstance(cities, list) or not all(isinstance(c, str) for c in cities):
+        raise SettingsError(f"'cities' in {CONFIG_PATH} must be a list of strings")
+
+    batch_size = cfg.get("transform_batch_size")
+    if batch_size is not None and (
+        isinstance(batch_size, bool) or not isinstance(batch_size, int) or batch_size <= 0
+    ):
+        raise SettingsError(
+            f"'transform_batch_size' in {CONFIG_PATH} must be a positive integer"
+        )
+
+    load_engine = cfg.get("load_engine", "arrow")
+    if load_engine not in ("arrow", "rows"):
+        raise SettingsError(f"'load_engine' in {CONFIG_PATH} must be 'arrow' or 'rows'")
+
+    return PipelineSettings(
+        cities=list(cities),
+        raw_path=cfg["raw_path"],
+        clean_path=cfg["clean_path"],
+        api_key=cfg.get("api_key"),
+        transform_batch_size=batch_size,
+        state_path=cfg.get("state_path", "data/state"),
+        load_engine=load_engine,
+    )
+
+
+def get_settings():
+    """
+    Trả về PipelineSettings dùng chung cho extract / transform / load / DAG.
+    config.json chỉ được đọc lại khi mtime thay đổi.
+    """
+    key = _mtime(CONFIG_PATH)
+    settings = _cache["settings"]
+    if settings is not None and _cache["settings_key"] == key:
+        return settings
+
+    with _lock:
+        if _cache["settings"] is not None and _cache["settings_key"] == key:
+            return _cache["settings"]
+
+        settings = _build_settings(_read_config(CONFIG_PATH))
+
+        _cache["settings"] = settings
+        _cache["settings_key"] = key
+        logging.info(f"Loaded pipeline settings from {CONFIG_PATH}")
+        return settings
+
+
+def _env_getter():
+    """
+    Đọc biến môi trường của process mỗi lần gọi, fallback .env.
+    Chỉ nội dung .env được cache theo path / mtime.
+    """
+    env_path = _find_env_path()
+    key = (env_path, _mtime(env_path))
+    with _lock:
+        if _cache["dotenv"] is None or _cache["dotenv_key"] != key:
+            _cache["dotenv"] = dotenv_values(env_path) if env_path else {}
+            _cache["dotenv_key"] = key
+        env = _cache["dotenv"]
+
+    def getenv(name):
+        # Biến môi trường của process được ưu tiên hơn .env (giống load_dotenv)
+        return os.environ.get(name) or env.get(name)
+
+    return getenv
+
+
+def get_postgres_settings():
+    """
+    Thông tin kết nối DWH, chỉ đọc từ biến môi trường / .env
+    (không cần config.json -> dùng được cho consumer chỉ đọc DB).
+    """
+    getenv = _env_getter()
+    return PostgresSettings(
+        host=getenv("POSTGRES_HOST"),
+        port=getenv("POSTGRES_PORT"),
+        user=getenv("POSTGRES_USER"),
+        password=getenv("POSTGRES_PASSWORD"),
+        dbname=getenv("POSTGRES_DB"),
+    )
+
+
+def get_api_key():
+    """
+    api_key trong config.json, nếu không có thì OPENWEATHER_API_KEY (env / .env)
+    đọc lúc gọi, giống get_postgres_settings.
+    """
+    return get_settings().api_key or _env_getter()("OPENWEATHER_API_KEY")
+
+
+def reset_settings_cache():
+    with _lock:
+        for key in _cache:
+            _cache[key] = None
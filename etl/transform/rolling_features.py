@@ -0,0 +1,299 @@
+import glob
+import json
+import logging
+import os
+from collections import deque
+
+import pandas as pd
+
+from etl.settings import get_settings
+
+logging.basicConfig(level=logging.INFO)
+
+WINDOW_3H = 3 * 3600
+WINDOW_24H = 24 * 3600
+# Gioi han so diem trong ring buffer (du cho extract moi phut trong 24h)
+MAX_WINDOW_POINTS = 24 * 60
+
+ROLLING_COLS = ["temp_avg_3h", "temp_avg_24h", "temp_delta", "rain_streak"]
+
+
+class RollingWindow:
+    """
+    Ring buffer (timestamp, temperature) giu tong chay de tinh trung binh O(1).
+    """
+
+    def __init__(self, seconds, points=()):
+        self.seconds = seconds
+        self.points = deque()
+        self.total = 0.0
+        for ts, temp in points:
+            self.push(ts, temp)
+
+    def push(self, ts, temp):
+        if len(self.points) >= MAX_WINDOW_POINTS:
+            _, old_temp = self.points.popleft()
+            self.total -= old_temp
+        self.points.append((ts, temp))
+        self.total += temp
+
+    def evict(self, now):
+        # Bo cac diem nam ngoai (now - seconds, now]
+        while self.points and self.points[0][0] <= now - self.seconds:
+            _, old_temp = self.points.popleft()
+            self.total -= old_temp
+
+    def mean(self):
+        if not self.points:
+            return None
+        return self.total / len(self.points)
+
+
+class RollingState:
+    """
+    State rolling cua 1 city, luu giua cac lan chay.
+    """
+
+    def __init__(self, city, last_ts=None, last_temp=None, rain_streak=0, window=()):
+        self.city = city
+        # last_ts cua state da commit ma lan transform nay bat dau tu
+        self.base_last_ts = last_ts
+        self.last_ts = last_ts
+        self.last_temp = last_temp
+        self.rain_streak = rain_streak
+        self.window_24h = RollingWindow(WINDOW_24H, window)
+        self.window_3h = RollingWindow(WINDOW_3H)
+        # Chi dung cho sidecar: parquet tuong ung da load xong, cho promote
+        self.loaded = False
+        if last_ts is not None:
+            # Dung lai cua so 3h tu cua so 24h (toi da MAX_WINDOW_POINTS diem)
+            for ts, temp in self.window_24h.points:
+                if ts > last_ts - WINDOW_3H:
+                    self.window_3h.push(ts, temp)
+
+    def update(self, ts, temp, is_rain):
+        """
+        Them 1 quan sat moi (ts > last_ts), tra ve cac feature rolling.
+        """
+        if temp is not None:
+            self.window_24h.push(ts, temp)
+            self.window_3h.push(ts, temp)
+        self.window_24h.evict(ts)
+        self.window_3h.evict(ts)
+
+        temp_delta = None
+        if temp is not None and self.last_temp is not None:
+            temp_delta = temp - self.last_temp
+        if temp is not None:
+            self.last_temp = temp
+
+        self.rain_streak = self.rain_streak + 1 if is_rain else 0
+        self.last_ts = ts
+
+        return {
+            "temp_avg_3h": self.window_3h.mean(),
+            "temp_avg_24h": self.window_24h.mean(),
+            "temp_delta": temp_delta,
+            "rain_streak": self.rain_streak,
+        }
+
+    def to_dict(self):
+        return {
+            "city": self.city,
+            "base_last_ts": self.base_last_ts,
+            "last_ts": self.last_ts,
+            "last_temp": self.last_temp,
+            "rain_streak": self.rain_streak,
+            "window": [list(point) for point in self.window_24h.points],
+        }
+
+
+PENDING_STATE_FILE = "rolling_state.json"
+
+
+def build_state_path(city):
+    return os.path.join(get_settings().state_path, "rolling", f"{city}.json")
+
+
+def build_pending_state_path(parquet_file):
+    # Sidecar canh parquet clean, load stage promote sau khi commit DWH
+    return os.path.join(os.path.dirname(parquet_file), PENDING_STATE_FILE)
+
+
+def _pending_date(path):
+    # Sidecar nam trong <clean_path>/<city>/<date>/
+    return os.path.basename(os.path.dirname(path))
+
+
+def _pending_state_paths(city, extra=None):
+    """
+    Cac sidecar chua promote cua city, sap xep theo ngay.
+    """
+    pattern = os.path.join(get_settings().clean_path, city, "*", PENDING_STATE_FILE)
+    paths = {os.path.abspath(path) for path in glob.glob(pattern)}
+    if extra is not None and os.path.exists(extra):
+        paths.add(os.path.abspath(extra))
+    return sorted(paths, key=lambda path: (_pending_date(path), path))
+
+
+def _read_state_file(path, city=None):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        logging.error(f"❌ Rolling state corrupted: {path}")
+        return None
+
+    state = RollingState(
+        city or data["city"],
+        last_ts=data.get("last_ts"),
+        last_temp=data.get("last_temp"),
+        rain_streak=data.get("rain_streak", 0),
+        window=[tuple(point) for point in data.get("window", [])],
+    )
+    state.base_last_ts = data.get("base_last_ts", state.last_ts)
+    state.loaded = data.get("loaded", False)
+    return state
+
+
+def _write_state_file(path, state, loaded=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = state.to_dict()
+    if loaded is not None:
+        data["loaded"] = loaded
+
+    # Ghi file tam roi replace de khong de lai state ghi do
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_rolling_state(city, date=None):
+    """
+    State da commit (chi duoc cap nhat sau khi load DWH thanh cong).
+    Neu co date: noi tiep sidecar chua load cua cac ngay truoc (backfill
+    transform nhieu ngay roi moi load), bat dau tu state da commit.
+    """
+    state = _read_state_file(build_state_path(city), city)
+    if state is None:
+        state = RollingState(city)
+    if date is None:
+        return state
+
+    for path in _pending_state_paths(city):
+        if _pending_date(path) >= date:
+            break
+        pending = _read_state_file(path, city)
+        if pending is not None and pending.base_last_ts == state.last_ts:
+            state = pending
+            state.base_last_ts = state.last_ts
+            state.loaded = False
+    return state
+
+
+def write_pending_state(state, parquet_file):
+    _write_state_file(build_pending_state_path(parquet_file), state, loaded=False)
+
+
+def _promote_loaded_chain(city, extra=None):
+    """
+    Promote lan luot cac sidecar da load, noi tiep nhau tu state da commit.
+    Dung o sidecar dau tien chua load (ngay do chua vao DWH).
+    """
+    committed = load_rolling_state(city)
+    for path in _pending_state_paths(city, extra):
+        pending = _read_state_file(path, city)
+        if pending is None or pending.base_last_ts != committed.last_ts:
+            continue
+        if not pending.loaded:
+            break
+
+        pending.base_last_ts = pending.last_ts
+        _write_state_file(build_state_path(city), pending)
+        os.remove(path)
+        committed = pending
+        logging.info(f"📈 Rolling state promoted for {city} ({_pending_date(path)})")
+    return committed
+
+
+def promote_pending_state(parquet_file):
+    """
+    Goi sau khi fact_weather da commit: danh dau sidecar da load roi promote
+    chuoi sidecar lien tiep -> state chinh cua city. Sidecar cua ngay sau duoc
+    giu lai cho den khi cac ngay truoc no load xong.
+    """
+    pending_path = build_pending_state_path(parquet_file)
+    pending = _read_state_file(pending_path)
+    if pending is None:
+        return False
+    _write_state_file(pending_path, pending, loaded=True)
+
+    committed = _promote_loaded_chain(pending.city, pending_path)
+    if not os.path.exists(pending_path):
+        return True
+
+    if committed.last_ts is not None and (
+        pending.base_last_ts is None or pending.base_last_ts < committed.last_ts
+    ):
+        # State chinh da vuot qua diem bat dau cua sidecar -> khong bao gio noi duoc
+        logging.warning(
+            f"[ROLLING] State of {pending.city} changed since transform "
+            f"(last_ts {committed.last_ts} != {pending.base_last_ts}), "
+            f"pending state not promoted: {pending_path}"
+        )
+        os.remove(pending_path)
+    else:
+        logging.info(
+            f"⏳ Rolling state of {pending.city} waits for earlier dates to load: "
+            f"{pending_path}"
+        )
+    return False
+
+
+def add_rolling_features(df, state):
+    """
+    Them cac cot rolling (temp_avg_3h, temp_avg_24h, temp_delta, rain_streak).
+    Chi cac quan sat moi hon state.last_ts duoc tinh va cap nhat state;
+    quan sat khong moi hon (da load o lan truoc / backfill cu) de NULL,
+    load giu gia tri cu trong DWH neu co.
+    """
+    features = {col: [None] * len(df) for col in ROLLING_COLS}
+
+    # Xu ly theo thu tu thoi gian, ghi ket qua ve dung vi tri dong
+    timestamps = df["timestamp"].tolist()
+    temperatures = df["temperature"].tolist()
+    rains = df["is_rain"].tolist()
+    order = sorted(
+        (i for i in range(len(df)) if not pd.isna(timestamps[i])),
+        key=lambda i: timestamps[i],
+    )
+
+    new_rows = 0
+    skipped = 0
+    for i in order:
+        ts = int(timestamps[i])
+        if state.last_ts is not None and ts <= state.last_ts:
+            skipped += 1
+            continue
+
+        temp = temperatures[i]
+        temp = None if pd.isna(temp) else float(temp)
+        values = state.update(ts, temp, bool(rains[i]))
+        for col in ROLLING_COLS:
+            features[col][i] = values[col]
+        new_rows += 1
+
+    for col in ROLLING_COLS:
+        df[col] = features[col]
+
+    logging.info(f"📈 Rolling features updated for {new_rows} new records")
+    if skipped:
+        logging.warning(
+            f"[ROLLING] {skipped} records of {state.city} are not newer than "
+            f"last_ts={state.last_ts} (already processed or out of order): "
+            "rolling features left NULL"
+        )
+    return df
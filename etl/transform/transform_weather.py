@@ -6,20 +6,112 @@ import time
 
 import pandas as pd
 import psutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etl.settings import get_settings
+from etl.transform.rolling_features import (
+    add_rolling_features,
+    load_rolling_state,
+    write_pending_state,
+)
 
 logging.basicConfig(level=logging.INFO)
 
+# Thu tu cot sau khi parse
+ORDERED_COLS = [
+    "city",
+    "temperature",
+    "feels_like",
+    "temp_min",
+    "temp_max",
+    "humidity",
+    "pressure",
+    "weather",
+    "weather_description",
+    "wind_speed",
+    "timestamp",
+    "timestamp_utc",
+    "date",
+    "hour",
+]
+
+# Kieu du lieu co dinh cho record sau parse: pd.DataFrame(rows) tu doan kieu
+# theo tung batch (cot toan None -> object), phai ep kieu truoc validate / enrich
+RAW_DTYPES = {
+    "city": "object",
+    "temperature": "float64",
+    "feels_like": "float64",
+    "temp_min": "float64",
+    "temp_max": "float64",
+    "humidity": "Int64",
+    "pressure": "Int64",
+    "weather": "object",
+    "weather_description": "object",
+    "wind_speed": "float64",
+    "timestamp": "Int64",
+}
+
+# Schema parquet clean co dinh: streaming va in-memory ghi ra cung kieu du lieu
+CLEAN_SCHEMA = pa.schema(
+    [
+        ("city", pa.string()),
+        ("temperature", pa.float64()),
+        ("feels_like", pa.float64()),
+        ("temp_min", pa.float64()),
+        ("temp_max", pa.float64()),
+        ("humidity", pa.int64()),
+        ("pressure", pa.int64()),
+        ("weather", pa.string()),
+        ("weather_description", pa.string()),
+        ("wind_speed", pa.float64()),
+        ("timestamp", pa.int64()),
+        ("timestamp_utc", pa.timestamp("ns")),
+        ("date", pa.string()),
+        ("hour", pa.int64()),
+        ("feels_like_diff", pa.float64()),
+        ("temp_category", pa.string()),
+        ("is_rain", pa.bool_()),
+        ("wind_level", pa.string()),
+        ("weather_category", pa.string()),
+        ("temp_avg_3h", pa.float64()),
+        ("temp_avg_24h", pa.float64()),
+        ("temp_delta", pa.float64()),
+        ("rain_streak", pa.int64()),
+    ]
+)
+
+
+def read_observation_ts(json_file):
+    # dt (thoi diem quan sat) cua 1 file raw, None neu file hong / thieu dt
+    try:
+        with open(json_file) as f:
+            dt = json.load(f).get("dt")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if isinstance(dt, bool) or not isinstance(dt, (int, float)):
+        return None
+    return dt
+
 
 def load_raw_files(city, date):
     json_files_list = []
-    hours_path = os.path.join("data/raw", city, date)
+    hours_path = os.path.join(get_settings().raw_path, city, date)
     for hour_folder_name in os.listdir(hours_path):
         for json_file in glob.glob(
             os.path.join(hours_path, hour_folder_name, "*.json")
         ):
             json_file = json_file.replace("\\", "/")
             json_files_list.append(json_file)
-    return json_files_list
+
+    # Sap xep theo dt trong file (dt cua OpenWeather co the lui so voi gio extract),
+    # roi ten file: streaming nhan record dung thu tu thoi gian du chia batch the nao,
+    # rolling feature giong het ban in-memory. File hong / thieu dt xep cuoi.
+    def sort_key(json_file):
+        ts = read_observation_ts(json_file)
+        return (ts is None, ts or 0, json_file)
+
+    return sorted(json_files_list, key=sort_key)
 
 
 def parse_weather_json(json_data, city):
@@ -125,33 +217,37 @@ def validate_data(df):
     return df
 
 
-def tranform_city(city, date):
-    logging.info(f"===== 🔧 START TRANSFORM for {city} - {date} =====")
-    start = time.time()
-
-    json_files_list = load_raw_files(city, date)
-    if not json_files_list:
-        logging.warning(f"Not found raw file for {city} on {date}")
-        return None
-    logging.info(f"📄 Found {len(json_files_list)} raw files for {city}")
-
-    rows = []
+def iter_weather_records(json_files_list, city):
+    # Doc tung file json, yield tung record (khong giu toan bo trong memory)
     for file in json_files_list:
         logging.info(f"➡️ Parsing file: {file}")
         try:
-            weather_data = json.load(open(file))
+            with open(file) as f:
+                weather_data = json.load(f)
             record = parse_weather_json(weather_data, city)
         except json.JSONDecodeError:
             logging.error(f"❌ Parse failed: {file}")
             continue
-        rows.append(record)
+        yield record
+
+
+def iter_record_batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    if not rows:
-        logging.warning(f"❗ No valid JSON for {city}")
-        return None
 
-    weather_df = pd.DataFrame(rows)
-    logging.info(f"📌 Parsed records: {len(weather_df)}")
+def build_clean_table(rows, rolling_state):
+    """
+    parse -> validate -> enrich cho 1 nhom record, tra ve pyarrow Table theo CLEAN_SCHEMA.
+    rolling_state duoc cap nhat tang dan voi cac record moi.
+    """
+    weather_df = pd.DataFrame(rows).astype(RAW_DTYPES)
 
     # Chuyen doi timestamp thanh datetime chuan iso va them hai cot date va hour
     weather_df["timestamp_utc"] = pd.to_datetime(weather_df["timestamp"], unit="s")
@@ -159,37 +255,107 @@ def tranform_city(city, date):
     weather_df["hour"] = weather_df["timestamp_utc"].dt.hour.astype(int)
 
     # Sap xep thu tu cac cot
-    ordered_cols = [
-        "city",
-        "temperature",
-        "feels_like",
-        "temp_min",
-        "temp_max",
-        "humidity",
-        "pressure",
-        "weather",
-        "weather_description",
-        "wind_speed",
-        "timestamp",
-        "timestamp_utc",
-        "date",
-        "hour",
-    ]
-    weather_df = weather_df[ordered_cols]
+    weather_df = weather_df[ORDERED_COLS]
     # Data quality check va enrich df
     weather_df = validate_data(weather_df)
     weather_df = feature_engineering(weather_df)
+    weather_df = add_rolling_features(weather_df, rolling_state)
+
+    return pa.Table.from_pandas(weather_df, schema=CLEAN_SCHEMA, preserve_index=False)
 
+
+def build_clean_out_path(city, date):
     # Tao thu muc output clean
-    with open("config/config.json", "r") as f:
-        cfg = json.load(f)
-        clean_base = cfg["clean_path"]
+    clean_base = get_settings().clean_path
     out_dir = os.path.join(clean_base, city, date)
     os.makedirs(out_dir, exist_ok=True)
+    return os.path.join(out_dir, "weather_clean_enriched.parquet")
+
+
+def write_clean_in_memory(json_files_list, city, date, rolling_state):
+    rows = list(iter_weather_records(json_files_list, city))
+    if not rows:
+        logging.warning(f"❗ No valid JSON for {city}")
+        return None
+    logging.info(f"📌 Parsed records: {len(rows)}")
+
+    table = build_clean_table(rows, rolling_state)
 
     # Ghi parquet
-    out_path = os.path.join(out_dir, "weather_clean_enriched.parquet")
-    weather_df.to_parquet(out_path, index=False, engine="pyarrow")
+    out_path = build_clean_out_path(city, date)
+    pq.write_table(table, out_path)
+    return out_path
+
+
+def write_clean_streaming(json_files_list, city, date, batch_size, rolling_state):
+    """
+    Streaming transform: moi batch toi da batch_size record di qua
+    parse -> validate -> enrich roi ghi ngay bang ParquetWriter (1 row group / batch).
+    Memory toi da ~ 1 batch, output giong ban in-memory.
+    """
+    out_path = build_clean_out_path(city, date)
+    tmp_path = out_path + ".tmp"
+
+    writer = None
+    total = 0
+    try:
+        records = iter_weather_records(json_files_list, city)
+        for rows in iter_record_batches(records, batch_size):
+            table = build_clean_table(rows, rolling_state)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, CLEAN_SCHEMA)
+            writer.write_table(table)
+            total += len(rows)
+            logging.info(f"📌 Written batch: {len(rows)} records (total {total})")
+    except Exception:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if writer is not None:
+        writer.close()
+
+    if writer is None:
+        logging.warning(f"❗ No valid JSON for {city}")
+        return None
+
+    # Chi thay file clean cu khi da ghi xong
+    os.replace(tmp_path, out_path)
+    logging.info(f"📌 Parsed records: {total}")
+    return out_path
+
+
+def tranform_city(city, date, batch_size=None):
+    logging.info(f"===== 🔧 START TRANSFORM for {city} - {date} =====")
+    start = time.time()
+
+    json_files_list = load_raw_files(city, date)
+    if not json_files_list:
+        logging.warning(f"Not found raw file for {city} on {date}")
+        return None
+    logging.info(f"📄 Found {len(json_files_list)} raw files for {city}")
+
+    # batch_size (tham so hoac transform_batch_size trong config) -> streaming mode
+    if batch_size is None:
+        batch_size = get_settings().transform_batch_size
+
+    # State rolling da commit cua city, noi tiep sidecar cua cac ngay truoc chua load
+    rolling_state = load_rolling_state(city, date)
+
+    if batch_size:
+        logging.info(f"🌊 Streaming transform, batch size {batch_size}")
+        out_path = write_clean_streaming(
+            json_files_list, city, date, batch_size, rolling_state
+        )
+    else:
+        out_path = write_clean_in_memory(json_files_list, city, date, rolling_state)
+    if out_path is None:
+        return None
+
+    # State moi chi la "pending": load stage promote sau khi commit DWH
+    write_pending_state(rolling_state, out_path)
 
     logging.info(f"💾 Saved Parquet: {out_path}")
     logging.info(
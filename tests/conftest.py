@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Cho phep `import etl...` khi chay pytest tu thu muc goc repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+from etl.load import load_to_dwh
+
+
+def test_get_latest_weather_returns_copies(monkeypatch):
+    calls = []
+
+    def fake_refresh():
+        calls.append(1)
+        return {"Hanoi": {"city_name": "Hanoi", "temperature": 30.0}}
+
+    monkeypatch.setattr(load_to_dwh, "_refresh_latest_weather", fake_refresh)
+    load_to_dwh.invalidate_latest_weather_cache()
+
+    all_cities = load_to_dwh.get_latest_weather()
+    all_cities["Hanoi"]["temperature"] = -1
+    one_city = load_to_dwh.get_latest_weather("Hanoi")
+    one_city["temperature"] = -2
+
+    assert load_to_dwh.get_latest_weather("Hanoi")["temperature"] == 30.0
+    assert load_to_dwh.get_latest_weather("Hue") is None
+    assert len(calls) == 1
+
+
+def test_get_latest_weather_refreshes_after_invalidate(monkeypatch):
+    calls = []
+
+    def fake_refresh():
+        calls.append(1)
+        return {}
+
+    monkeypatch.setattr(load_to_dwh, "_refresh_latest_weather", fake_refresh)
+    load_to_dwh.invalidate_latest_weather_cache()
+
+    load_to_dwh.get_latest_weather()
+    load_to_dwh.invalidate_latest_weather_cache()
+    load_to_dwh.get_latest_weather()
+
+    assert len(calls) == 2
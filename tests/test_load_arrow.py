@@ -0,0 +1,99 @@
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from etl.load.load_arrow import (
+    PARQUET_COLUMNS,
+    STAGE_COLUMNS,
+    build_stage_batch,
+    select_parquet_columns,
+    write_copy_buffer,
+)
+
+STAGE_NAMES = [name for name, _, _ in STAGE_COLUMNS]
+
+
+def stage_batch(**overrides):
+    row = {
+        "city_id": 1,
+        "condition_id": 2,
+        "date_id": 2024010100,
+        "temperature": 20.5,
+        "city_name": "Hanoi",
+        "weather": "Rain",
+    }
+    row.update(overrides)
+    arrays = [
+        pa.array([row.get(name)], type=type_) for name, _, type_ in STAGE_COLUMNS
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=STAGE_NAMES)
+
+
+def copy_fields(batch):
+    return write_copy_buffer(batch).getvalue().decode().rstrip("\n")
+
+
+def test_copy_buffer_writes_null_as_unquoted_empty_field():
+    line = copy_fields(stage_batch())
+    fields = dict(zip(STAGE_NAMES, line.split(",")))
+
+    # COPY csv: field rong khong quote = NULL
+    assert fields["temp_avg_3h"] == ""
+    assert fields["humidity"] == ""
+    assert fields["is_rain"] == ""
+    assert fields["temperature"] == "20.5"
+
+
+def test_copy_buffer_quotes_strings_and_escapes():
+    line = copy_fields(
+        stage_batch(city_name='Ho Chi Minh, "HCM"', weather="", wind_level=None)
+    )
+    fields = dict(zip(STAGE_NAMES, next(csv.reader(io.StringIO(line)))))
+
+    assert '"Ho Chi Minh, ""HCM"""' in line
+    assert fields["city_name"] == 'Ho Chi Minh, "HCM"'
+    # Chuoi rong quote ("") != NULL
+    assert '""' in line.split(",")
+    assert fields["weather"] == ""
+    assert fields["wind_level"] == ""
+    assert len(fields) == len(STAGE_NAMES)
+
+
+def test_old_parquet_without_rolling_columns_is_filled_with_nulls(tmp_path):
+    old_columns = [
+        c
+        for c in PARQUET_COLUMNS
+        if c
+        not in ("weather_category", "temp_avg_3h", "temp_avg_24h", "temp_delta", "rain_streak")
+    ]
+    values = {
+        "city": ["Hanoi"],
+        "date": ["2024-01-01"],
+        "hour": [0],
+        "timestamp_utc": pa.array([1704067200], type=pa.timestamp("s")),
+        "temperature": [20.0],
+        "humidity": [80.0],
+        "weather": ["Rain"],
+        "weather_description": ["light rain"],
+        "is_rain": [True],
+    }
+    table = pa.table({c: values.get(c, [None]) for c in old_columns})
+    path = tmp_path / "old.parquet"
+    pq.write_table(table, path)
+
+    parquet = pq.ParquetFile(path)
+    columns = select_parquet_columns(parquet.schema_arrow)
+    assert columns == old_columns
+
+    batch = next(parquet.iter_batches(columns=columns))
+    ids = pa.array([1], pa.int32())
+    stage = build_stage_batch(batch, ids, ids, pa.array([2024010100], pa.int64()))
+
+    assert stage.schema.names == STAGE_NAMES
+    for name in ("weather_category", "temp_avg_3h", "rain_streak"):
+        assert stage.column(name).null_count == 1
+    assert stage.column("humidity").type == pa.int64()
+    assert pc.equal(stage.column("humidity"), 80)[0].as_py()
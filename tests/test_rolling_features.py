@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+from etl import settings as settings_module
+from etl.transform import rolling_features
+from etl.transform.rolling_features import (
+    WINDOW_3H,
+    RollingState,
+    RollingWindow,
+    add_rolling_features,
+    build_pending_state_path,
+    load_rolling_state,
+    promote_pending_state,
+    write_pending_state,
+)
+
+T0 = 1704067200
+HOUR = 3600
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.json").write_text(
+        json.dumps(
+            {
+                "cities": ["Hanoi"],
+                "raw_path": "data/raw",
+                "clean_path": "data/clean",
+                "state_path": "data/state",
+            }
+        )
+    )
+    settings_module.reset_settings_cache()
+    yield tmp_path
+    settings_module.reset_settings_cache()
+
+
+def make_df(timestamps, temperatures, rains):
+    return pd.DataFrame(
+        {"timestamp": timestamps, "temperature": temperatures, "is_rain": rains}
+    )
+
+
+def test_window_evicts_points_at_exact_boundary():
+    window = RollingWindow(WINDOW_3H)
+    window.push(T0, 10.0)
+    window.push(T0 + HOUR, 20.0)
+
+    # Diem dung tai now - 3h nam ngoai cua so (now - 3h, now]
+    window.evict(T0 + WINDOW_3H)
+    assert window.mean() == 20.0
+
+    window.evict(T0 + HOUR + WINDOW_3H - 1)
+    assert window.mean() == 20.0
+
+    window.evict(T0 + HOUR + WINDOW_3H)
+    assert window.mean() is None
+    assert window.total == 0.0
+
+
+def test_window_is_capped_by_max_points(monkeypatch):
+    monkeypatch.setattr(rolling_features, "MAX_WINDOW_POINTS", 3)
+    window = RollingWindow(WINDOW_3H)
+    for i, temp in enumerate([1.0, 2.0, 3.0, 4.0]):
+        window.push(T0 + i, temp)
+
+    assert [temp for _, temp in window.points] == [2.0, 3.0, 4.0]
+    assert window.mean() == 3.0
+
+
+def test_state_update_delta_streak_and_averages():
+    state = RollingState("Hanoi")
+
+    first = state.update(T0, 20.0, True)
+    second = state.update(T0 + HOUR, 22.0, True)
+    third = state.update(T0 + 2 * HOUR, None, False)
+    fourth = state.update(T0 + 4 * HOUR, 30.0, True)
+
+    assert first == {
+        "temp_avg_3h": 20.0,
+        "temp_avg_24h": 20.0,
+        "temp_delta": None,
+        "rain_streak": 1,
+    }
+    assert second["temp_delta"] == 2.0
+    assert second["rain_streak"] == 2
+    # Temp NULL: khong vao cua so, streak reset
+    assert third["temp_avg_3h"] == 21.0
+    assert third["temp_delta"] is None
+    assert third["rain_streak"] == 0
+    # Diem T0 va T0+1h da ra khoi cua so 3h nhung van trong 24h
+    assert fourth["temp_avg_3h"] == 30.0
+    assert fourth["temp_avg_24h"] == 24.0
+    assert fourth["temp_delta"] == 8.0
+    assert fourth["rain_streak"] == 1
+
+
+def test_state_round_trip_rebuilds_3h_window():
+    state = RollingState("Hanoi")
+    for i, temp in enumerate([10.0, 12.0, 14.0, 16.0, 18.0]):
+        state.update(T0 + i * HOUR, temp, False)
+
+    restored = RollingState(
+        "Hanoi",
+        last_ts=state.last_ts,
+        last_temp=state.last_temp,
+        rain_streak=state.rain_streak,
+        window=[tuple(p) for p in json.loads(json.dumps(state.to_dict()))["window"]],
+    )
+
+    assert restored.window_24h.mean() == state.window_24h.mean()
+    assert list(restored.window_3h.points) == list(state.window_3h.points)
+
+    continued = state.update(T0 + 5 * HOUR, 20.0, True)
+    assert restored.update(T0 + 5 * HOUR, 20.0, True) == continued
+
+
+def test_add_rolling_features_processes_in_time_order():
+    state = RollingState("Hanoi")
+    df = make_df([T0 + 2 * HOUR, T0, T0 + HOUR], [30.0, 10.0, 20.0], [True, True, False])
+
+    df = add_rolling_features(df, state)
+
+    assert df["temp_delta"].isna().tolist() == [False, True, False]
+    assert df["temp_delta"].dropna().tolist() == [10.0, 10.0]
+    assert df["rain_streak"].tolist() == [1, 1, 0]
+    assert state.last_ts == T0 + 2 * HOUR
+
+
+def test_add_rolling_features_warns_on_already_seen_rows(caplog):
+    state = RollingState("Hanoi", last_ts=T0 + HOUR, last_temp=20.0)
+    df = make_df([T0, T0 + HOUR, T0 + 2 * HOUR], [10.0, 20.0, 30.0], [False] * 3)
+
+    with caplog.at_level(logging.WARNING):
+        df = add_rolling_features(df, state)
+
+    assert df["temp_delta"].isna().tolist() == [True, True, False]
+    assert df["rain_streak"].isna().tolist() == [True, True, False]
+    assert "2 records of Hanoi" in caplog.text
+
+
+def test_pending_state_is_only_promoted_explicitly(state_dir):
+    parquet_file = str(state_dir / "data" / "clean" / "Hanoi" / "x.parquet")
+    state = load_rolling_state("Hanoi")
+    state.update(T0, 20.0, False)
+    write_pending_state(state, parquet_file)
+
+    # Transform chay lai truoc khi load: van bat dau tu state da commit
+    assert load_rolling_state("Hanoi").last_ts is None
+
+    assert promote_pending_state(parquet_file)
+    assert load_rolling_state("Hanoi").last_ts == T0
+    assert not (state_dir / build_pending_state_path(parquet_file)).exists()
+    assert not promote_pending_state(parquet_file)
+
+
+def test_stale_pending_state_is_not_promoted(state_dir):
+    old_file = str(state_dir / "data" / "clean" / "Hanoi" / "old" / "x.parquet")
+    new_file = str(state_dir / "data" / "clean" / "Hanoi" / "new" / "x.parquet")
+
+    stale = load_rolling_state("Hanoi")
+    stale.update(T0, 20.0, False)
+    write_pending_state(stale, old_file)
+
+    fresh = load_rolling_state("Hanoi")
+    fresh.update(T0 + HOUR, 25.0, False)
+    write_pending_state(fresh, new_file)
+
+    assert promote_pending_state(new_file)
+    assert not promote_pending_state(old_file)
+    assert load_rolling_state("Hanoi").last_ts == T0 + HOUR
+    # Sidecar cu khong bao gio noi duoc vao state -> bo
+    assert not os.path.exists(build_pending_state_path(old_file))
+
+
+def test_pending_states_chain_across_dates(state_dir):
+    day1 = "data/clean/Hanoi/2024-01-01/x.parquet"
+    day2 = "data/clean/Hanoi/2024-01-02/x.parquet"
+
+    state = load_rolling_state("Hanoi", "2024-01-01")
+    state.update(T0, 20.0, True)
+    write_pending_state(state, day1)
+
+    # Ngay 2 transform truoc khi ngay 1 load: noi tiep sidecar ngay 1
+    state = load_rolling_state("Hanoi", "2024-01-02")
+    assert state.last_ts == T0
+    assert state.update(T0 + HOUR, 22.0, True)["temp_delta"] == 2.0
+    assert state.rain_streak == 2
+    write_pending_state(state, day2)
+
+    # Chay lai ngay 1 khong dung sidecar cua chinh no / ngay sau
+    assert load_rolling_state("Hanoi", "2024-01-01").last_ts is None
+
+    # Ngay 2 load truoc: cho ngay 1
+    assert not promote_pending_state(day2)
+    assert load_rolling_state("Hanoi").last_ts is None
+    assert os.path.exists(build_pending_state_path(day2))
+
+    # Ngay 1 load xong: promote ca chuoi
+    assert promote_pending_state(day1)
+    assert load_rolling_state("Hanoi").last_ts == T0 + HOUR
+    assert not os.path.exists(build_pending_state_path(day1))
+    assert not os.path.exists(build_pending_state_path(day2))
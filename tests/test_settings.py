@@ -0,0 +1,152 @@
+import json
+import os
+
+import pytest
+
+from etl import settings as settings_module
+from etl.settings import SettingsError, _build_settings
+
+BASE_CFG = {"cities": ["Hanoi"], "raw_path": "data/raw", "clean_path": "data/clean"}
+POSTGRES_ENV = {
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "admin",
+    "POSTGRES_PASSWORD": "admin",
+    "POSTGRES_DB": "weather_dwh",
+}
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch, tmp_path):
+    for key in list(POSTGRES_ENV) + ["OPENWEATHER_API_KEY"]:
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.chdir(tmp_path)
+    settings_module.reset_settings_cache()
+    yield
+    settings_module.reset_settings_cache()
+
+
+def test_build_settings_defaults():
+    settings = _build_settings(dict(BASE_CFG))
+
+    assert settings.cities == ["Hanoi"]
+    assert settings.api_key is None
+    assert settings.transform_batch_size is None
+    assert settings.state_path == "data/state"
+    assert settings.load_engine == "arrow"
+
+
+def test_build_settings_hides_api_key():
+    settings = _build_settings({**BASE_CFG, "api_key": "secret"})
+
+    assert settings.api_key == "secret"
+    assert "secret" not in repr(settings)
+
+
+@pytest.mark.parametrize("missing", ["cities", "raw_path", "clean_path"])
+def test_build_settings_missing_key(missing):
+    cfg = dict(BASE_CFG)
+    del cfg[missing]
+
+    with pytest.raises(SettingsError, match=missing):
+        _build_settings(cfg)
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        {"cities": "Hanoi"},
+        {"cities": ["Hanoi", 1]},
+        {"transform_batch_size": 0},
+        {"transform_batch_size": True},
+        {"transform_batch_size": "100"},
+        {"load_engine": "pandas"},
+    ],
+)
+def test_build_settings_invalid_values(override):
+    with pytest.raises(SettingsError):
+        _build_settings({**BASE_CFG, **override})
+
+
+def test_build_api_url_requires_api_key(tmp_path):
+    from etl.extract.extract_weather import build_api_url
+
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.json").write_text(json.dumps(BASE_CFG))
+
+    with pytest.raises(SettingsError, match="api_key"):
+        build_api_url("Hanoi")
+
+
+def test_api_key_env_fallback_is_read_at_call_time(tmp_path, monkeypatch):
+    from etl.extract.extract_weather import build_api_url
+
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.json").write_text(json.dumps(BASE_CFG))
+    settings = settings_module.get_settings()
+
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "first")
+    assert "appid=first" in build_api_url("Hanoi")
+
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "second")
+    assert "appid=second" in build_api_url("Hanoi")
+    # config.json khong doi -> van dung settings da cache
+    assert settings_module.get_settings() is settings
+
+
+def test_config_api_key_wins_over_env(tmp_path, monkeypatch):
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.json").write_text(
+        json.dumps({**BASE_CFG, "api_key": "from_config"})
+    )
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "from_env")
+
+    assert settings_module.get_api_key() == "from_config"
+
+
+def test_postgres_settings_do_not_need_config(tmp_path):
+    # Khong co config/config.json: consumer chi doc DB van ket noi duoc
+    (tmp_path / ".env").write_text(
+        "\n".join(f"{key}={value}" for key, value in POSTGRES_ENV.items())
+    )
+
+    params = settings_module.get_postgres_settings().params()
+
+    assert params["host"] == "localhost"
+    assert params["database"] == "weather_dwh"
+
+
+def test_postgres_settings_missing_env():
+    with pytest.raises(SettingsError, match="POSTGRES_HOST"):
+        settings_module.get_postgres_settings().params()
+
+
+def test_env_file_created_after_first_read_is_picked_up(tmp_path):
+    assert settings_module.get_postgres_settings().host is None
+
+    (tmp_path / ".env").write_text("POSTGRES_HOST=db\n")
+
+    assert settings_module.get_postgres_settings().host == "db"
+
+
+def test_get_settings_reloads_when_config_changes(tmp_path):
+    config = tmp_path / "config" / "config.json"
+    config.parent.mkdir()
+    config.write_text(json.dumps(BASE_CFG))
+    first = settings_module.get_settings()
+
+    assert settings_module.get_settings() is first
+
+    config.write_text(json.dumps({**BASE_CFG, "cities": ["Hue"]}))
+    stat = config.stat()
+    os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert settings_module.get_settings().cities == ["Hue"]
+
+
+def test_postgres_settings_follow_process_env(monkeypatch):
+    monkeypatch.setenv("POSTGRES_DB", "first")
+    assert settings_module.get_postgres_settings().dbname == "first"
+
+    monkeypatch.setenv("POSTGRES_DB", "second")
+    assert settings_module.get_postgres_settings().dbname == "second"
@@ -0,0 +1,174 @@
+import json
+import shutil
+
+import pyarrow.parquet as pq
+import pytest
+
+from etl import settings as settings_module
+from etl.transform.transform_weather import CLEAN_SCHEMA, tranform_city
+
+CITY = "Hanoi"
+DATE = "2024-01-01"
+START_TS = 1704067200
+
+
+def make_raw(ts, temp=20.0, wind=3.0, humidity=80, weather="Rain"):
+    main = {"feels_like": 21.0, "temp_min": 18.0, "temp_max": 25.0, "pressure": 1010}
+    if temp is not None:
+        main["temp"] = temp
+    if humidity is not None:
+        main["humidity"] = humidity
+    data = {
+        "main": main,
+        "weather": [{"main": weather, "description": "light rain"}],
+        "dt": ts,
+    }
+    if wind is not None:
+        data["wind"] = {"speed": wind}
+    return data
+
+
+@pytest.fixture
+def pipeline_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "config.json").write_text(
+        json.dumps(
+            {
+                "cities": [CITY],
+                "raw_path": "data/raw",
+                "clean_path": "data/clean",
+                "state_path": "data/state",
+            }
+        )
+    )
+    settings_module.reset_settings_cache()
+
+    # 6 gio x 2 file: gio 01 va 02 thieu temp / wind o moi record (batch toan null),
+    # gio 03 thieu humidity 1 record, gio 04 co 1 file json hong
+    for hour in range(6):
+        hour_dir = tmp_path / "data" / "raw" / CITY / DATE / f"{hour:02}"
+        hour_dir.mkdir(parents=True)
+        for minute in (0, 30):
+            ts = START_TS + hour * 3600 + minute * 60
+            kwargs = {"temp": 15.0 + hour * 4 + minute / 30}
+            if hour in (1, 2):
+                kwargs = {"temp": None, "wind": None}
+            if hour == 3 and minute == 30:
+                kwargs["humidity"] = None
+            path = hour_dir / f"weather_{DATE}-{hour:02}-{minute:02}.json"
+            path.write_text(json.dumps(make_raw(ts, **kwargs)))
+    (tmp_path / "data" / "raw" / CITY / DATE / "04" / "weather_broken.json").write_text("{")
+
+    yield tmp_path
+    settings_module.reset_settings_cache()
+
+
+def run_transform(tmp_path, batch_size):
+    # Moi lan chay bat dau tu state rong de so sanh ca cot rolling
+    shutil.rmtree(tmp_path / "data" / "state", ignore_errors=True)
+    out_path = tranform_city(CITY, DATE, batch_size=batch_size)
+    return pq.read_table(out_path)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 5])
+def test_streaming_matches_in_memory(pipeline_dir, batch_size):
+    expected = run_transform(pipeline_dir, None)
+    streamed = run_transform(pipeline_dir, batch_size)
+
+    assert expected.num_rows == 12
+    assert expected.schema.equals(CLEAN_SCHEMA)
+    assert streamed.equals(expected)
+
+
+def test_all_null_batch_is_written_as_nulls(pipeline_dir):
+    table = run_transform(pipeline_dir, 2).to_pylist()
+    hour_1 = [row for row in table if row["hour"] == 1]
+
+    assert len(hour_1) == 2
+    assert all(row["temperature"] is None for row in hour_1)
+    assert all(row["wind_speed"] is None for row in hour_1)
+    assert all(row["wind_level"] == "normal" for row in hour_1)
+
+
+def test_rerun_before_load_recomputes_rolling_features(pipeline_dir):
+    from etl.transform.rolling_features import promote_pending_state
+
+    first = tranform_city(CITY, DATE)
+    first_table = pq.read_table(first)
+    # Load chua chay (hoac fail): chay lai transform van tinh lai feature
+    second_table = pq.read_table(tranform_city(CITY, DATE))
+    assert second_table.equals(first_table)
+    assert second_table.column("rain_streak").null_count == 0
+
+    # Sau khi load commit va promote state: ban ghi cu de NULL (DWH giu gia tri)
+    assert promote_pending_state(first)
+    third_table = pq.read_table(tranform_city(CITY, DATE))
+    assert third_table.column("rain_streak").null_count == third_table.num_rows
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_streaming_matches_in_memory_with_out_of_order_dt(pipeline_dir, batch_size):
+    # dt cua file gio 01 cu hon gio 00: thu tu xu ly khong phu thuoc vao batch
+    raw_dir = pipeline_dir / "data" / "raw" / CITY / "2024-01-02"
+    for hour, offset, temp in [("00", 600, 10.0), ("01", 300, 11.0), ("02", 7200, 13.0)]:
+        (raw_dir / hour).mkdir(parents=True)
+        (raw_dir / hour / f"weather_2024-01-02-{hour}-00.json").write_text(
+            json.dumps(make_raw(START_TS + 86400 + offset, temp=temp))
+        )
+
+    def run(size):
+        shutil.rmtree(pipeline_dir / "data" / "state", ignore_errors=True)
+        return pq.read_table(tranform_city(CITY, "2024-01-02", batch_size=size))
+
+    expected = run(None)
+    streamed = run(batch_size)
+
+    assert expected.column("timestamp").to_pylist() == [
+        START_TS + 86400 + 300,
+        START_TS + 86400 + 600,
+        START_TS + 86400 + 7200,
+    ]
+    assert expected.column("temp_delta").to_pylist() == [None, -1.0, 3.0]
+    assert streamed.equals(expected)
+
+
+def test_backfill_two_dates_before_load_chains_rolling_state(pipeline_dir):
+    from etl.transform.rolling_features import (
+        build_pending_state_path,
+        load_rolling_state,
+        promote_pending_state,
+    )
+
+    day2 = "2024-01-02"
+    for hour in range(3):
+        hour_dir = pipeline_dir / "data" / "raw" / CITY / day2 / f"{hour:02}"
+        hour_dir.mkdir(parents=True)
+        (hour_dir / f"weather_{day2}-{hour:02}-00.json").write_text(
+            json.dumps(make_raw(START_TS + 86400 + hour * 3600, temp=30.0 + hour))
+        )
+
+    def reset():
+        shutil.rmtree(pipeline_dir / "data" / "state", ignore_errors=True)
+        shutil.rmtree(pipeline_dir / "data" / "clean", ignore_errors=True)
+
+    # Tham chieu: load + promote ngay 1 truoc khi transform ngay 2
+    reset()
+    assert promote_pending_state(tranform_city(CITY, DATE))
+    expected = pq.read_table(tranform_city(CITY, day2))
+
+    # Backfill: transform ca 2 ngay roi moi load
+    reset()
+    first = tranform_city(CITY, DATE)
+    second = tranform_city(CITY, day2)
+    chained = pq.read_table(second)
+
+    assert chained.equals(expected)
+    first_row = chained.to_pylist()[0]
+    assert first_row["temp_delta"] == 30.0 - 36.0
+    assert first_row["rain_streak"] == 13
+
+    assert promote_pending_state(first)
+    assert promote_pending_state(second)
+    assert load_rolling_state(CITY).last_ts == START_TS + 86400 + 2 * 3600
+    assert not (pipeline_dir / build_pending_state_path(second)).exists()
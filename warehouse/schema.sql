@@ -56,16 +56,67 @@ CREATE TABLE IF NOT EXISTS fact_weather (
     is_rain BOOLEAN,
     wind_level VARCHAR(255),
 
+    -- Rolling features (tính tăng dần ở transform)
+    temp_avg_3h DOUBLE PRECISION,
+    temp_avg_24h DOUBLE PRECISION,
+    temp_delta DOUBLE PRECISION,
+    rain_streak INT,
+
     -- KEY QUAN TRỌNG
     UNIQUE (city_id, timestamp_utc)
 );
 
+-- Migration cho DWH đã tạo trước khi có rolling features
+ALTER TABLE fact_weather ADD COLUMN IF NOT EXISTS temp_avg_3h DOUBLE PRECISION;
+ALTER TABLE fact_weather ADD COLUMN IF NOT EXISTS temp_avg_24h DOUBLE PRECISION;
+ALTER TABLE fact_weather ADD COLUMN IF NOT EXISTS temp_delta DOUBLE PRECISION;
+ALTER TABLE fact_weather ADD COLUMN IF NOT EXISTS rain_streak INT;
+
+-- ===============================
+-- SNAPSHOT TABLE
+-- ===============================
+
+-- 5. latest_weather
+-- 1 dòng / city, được load stage upsert khi có timestamp_utc mới hơn.
+-- Query "thời tiết hiện tại" chỉ cần đọc bảng này, không phải scan fact_weather.
+CREATE TABLE IF NOT EXISTS latest_weather (
+    city_id INT PRIMARY KEY REFERENCES dim_city(city_id),
+    city_name VARCHAR(255) NOT NULL,
+    condition_id INT REFERENCES dim_weather_condition(condition_id),
+    date_id INT REFERENCES dim_date(date_id),
+
+    timestamp_utc TIMESTAMP NOT NULL,
+
+    -- Metrics
+    temperature DOUBLE PRECISION,
+    feels_like DOUBLE PRECISION,
+    temp_min DOUBLE PRECISION,
+    temp_max DOUBLE PRECISION,
+    humidity INT,
+    pressure INT,
+    wind_speed DOUBLE PRECISION,
+    feels_like_diff DOUBLE PRECISION,
+
+    -- Denormalized tu dim_weather_condition
+    weather VARCHAR(255),
+    weather_description VARCHAR(255),
+    weather_category VARCHAR(255),
+
+    -- Derived
+    temp_category VARCHAR(255),
+    is_rain BOOLEAN,
+    wind_level VARCHAR(255),
+
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 
 
 -- ===============================
 -- DROP TABLE
 -- ===============================
 
+-- DROP TABLE IF EXISTS latest_weather CASCADE
 -- DROP TABLE IF EXISTS dim_city CASCADE
 -- DROP TABLE IF EXISTS dim_weather_condition CASCADE
 -- DROP TABLE IF EXISTS dim_date CASCADE